@@ -19,6 +19,14 @@ from trl import SFTTrainer
 from transformers import TrainingArguments
 import torch
 import json
+from pet_autotune import autotune
+from pet_checkpointing import AsyncCheckpointCallback, find_latest_checkpoint
+
+# Checkpoints live on Google Drive so they survive the runtime being recycled
+from google.colab import drive
+drive.mount("/content/drive")
+CHECKPOINT_DIR = "/content/drive/MyDrive/pet_specialized_checkpoints"
+HUB_MODEL_ID = "your-username/pet-gemma-3n-specialized"
 
 # 4. Load PET training dataset (200 examples)
 training_data = [
@@ -57,18 +65,26 @@ print("✅ LoRA configuration applied")
 # 7. Prepare dataset
 dataset = Dataset.from_list(training_data)
 
+# Autotune micro-batch / sequence length for this GPU (cached per GPU + model)
+settings = autotune(
+    model,
+    "unsloth/gemma-3n-2b-bnb-4bit",
+    seq_len=1024,
+    target_batch_size=8,
+)
+
 # 8. Training configuration
 trainer = SFTTrainer(
     model=model,
     tokenizer=tokenizer,
     train_dataset=dataset,
     dataset_text_field="text",
-    max_seq_length=1024,
+    max_seq_length=settings["seq_len"],
     dataset_num_proc=2,
     packing=False,
     args=TrainingArguments(
-        per_device_train_batch_size=2,
-        gradient_accumulation_steps=4,
+        per_device_train_batch_size=settings["batch_size"],
+        gradient_accumulation_steps=settings["gradient_accumulation_steps"],
         warmup_steps=10,
         max_steps=200,  # Full training
         learning_rate=1e-4,
@@ -80,20 +96,20 @@ trainer = SFTTrainer(
         lr_scheduler_type="linear",
         seed=3407,
         output_dir="./pet_specialized",
-        save_strategy="steps",
-        save_steps=50,
-        push_to_hub=True,  # Save to Hugging Face Hub
-        hub_model_id="your-username/pet-gemma-3n-specialized"
+        save_strategy="no",  # Adapter-only async checkpoints below
     ),
+    callbacks=[AsyncCheckpointCallback(CHECKPOINT_DIR, save_steps=50, save_total_limit=3)],
 )
 
-# 9. Execute training
+# 9. Execute training (resumes automatically if the Colab session was interrupted)
 print("🔥 Starting PET specialization training...")
-trainer.train()
+trainer.train(resume_from_checkpoint=find_latest_checkpoint(CHECKPOINT_DIR))
 
-# 10. Save the specialized model
+# 10. Save the specialized model and push it to Hugging Face Hub
 model.save_pretrained("pet_specialized_final")
 tokenizer.save_pretrained("pet_specialized_final")
+model.push_to_hub(HUB_MODEL_ID)
+tokenizer.push_to_hub(HUB_MODEL_ID)
 
 print("✅ PET specialized model training complete!")
 
@@ -6,34 +6,41 @@ Handles the complete deployment of your fine-tuned PET model
 
 import os
 import sys
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from peft import PeftModel, PeftConfig
 import json
+import shutil
+from importlib import metadata, util
+
+from pet_startup_profiler import StartupProfiler
+
+# torch / transformers / peft are imported lazily: the environment check and
+# model discovery must not pay for loading the ML stack
+REQUIRED_LIBRARIES = [
+    ("torch", "PyTorch"),
+    ("transformers", "Transformers"),
+    ("peft", "PEFT"),
+    ("accelerate", "Accelerate"),
+]
 
 def check_environment():
-    """Check if all required libraries are installed"""
+    """Check if all required libraries are installed (without importing them)"""
     print("🔍 Checking environment...")
     
-    try:
-        import torch
-        import transformers 
-        import peft
-        import accelerate
-        print("✅ All required libraries installed")
-        print(f"   PyTorch: {torch.__version__}")
-        print(f"   Transformers: {transformers.__version__}")
-        print(f"   PEFT: {peft.__version__}")
-        print(f"   CUDA available: {torch.cuda.is_available()}")
-        return True
-    except ImportError as e:
-        print(f"❌ Missing library: {e}")
+    missing = [module for module, _ in REQUIRED_LIBRARIES if util.find_spec(module) is None]
+    if missing:
+        print(f"❌ Missing library: {', '.join(missing)}")
         print("🔄 Install with: pip3 install torch transformers peft accelerate bitsandbytes")
         return False
 
-def load_peft_model():
+    print("✅ All required libraries installed")
+    for module, label in REQUIRED_LIBRARIES:
+        print(f"   {label}: {metadata.version(module)}")
+    print(f"   NVIDIA driver found: {shutil.which('nvidia-smi') is not None}")
+    return True
+
+def load_peft_model(profiler=None):
     """Load the PEFT (LoRA) fine-tuned model"""
     print("\n📥 Loading PET fine-tuned model...")
+    profiler = profiler or StartupProfiler()
     
     model_path = "PET-Gemma-3N-2B-enhanced"
     
@@ -49,25 +56,50 @@ def load_peft_model():
         base_model_name = adapter_config.get("base_model_name_or_path", "unsloth/gemma-2-2b")
         print(f"📋 Base model: {base_model_name}")
         print(f"📁 Adapter path: {model_path}")
+
+        with profiler.phase("import"):
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+            from peft import PeftModel
         
         # Load tokenizer
         print("📥 Loading tokenizer...")
-        tokenizer = AutoTokenizer.from_pretrained(base_model_name)
-        if tokenizer.pad_token is None:
-            tokenizer.pad_token = tokenizer.eos_token
+        with profiler.phase("tokenizer"):
+            tokenizer = AutoTokenizer.from_pretrained(base_model_name)
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
         
-        # Load base model
+        # Load base model: safetensors are memory-mapped and weights are
+        # materialized directly into the final tensors (no random init pass)
         print("📥 Loading base model...")
-        base_model = AutoModelForCausalLM.from_pretrained(
-            base_model_name,
-            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-            device_map="auto" if torch.cuda.is_available() else None,
-            trust_remote_code=True
-        )
+        with profiler.phase("weight-load"):
+            load_kwargs = dict(
+                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+                device_map="auto" if torch.cuda.is_available() else None,
+                low_cpu_mem_usage=True,
+                trust_remote_code=True
+            )
+            try:
+                base_model = AutoModelForCausalLM.from_pretrained(
+                    base_model_name, use_safetensors=True, **load_kwargs
+                )
+            except OSError as e:
+                # Repo ships only .bin weights: no mmap, the whole file is unpickled
+                print(f"⚠️  No safetensors weights for {base_model_name} ({e})")
+                print("⚠️  Falling back to .bin weights - slower, higher-memory startup")
+                base_model = AutoModelForCausalLM.from_pretrained(base_model_name, **load_kwargs)
         
         # Load PEFT adapter
         print("📥 Loading fine-tuned adapter...")
-        model = PeftModel.from_pretrained(base_model, model_path)
+        with profiler.phase("adapter-attach"):
+            model = PeftModel.from_pretrained(base_model, model_path)
+            model.eval()
+
+        # One tiny generation so the first real request doesn't pay for lazy init
+        with profiler.phase("warmup"):
+            inputs = tokenizer("<|im_start|>user\nHi<|im_end|>\n", return_tensors="pt").to(model.device)
+            with torch.no_grad():
+                model.generate(**inputs, max_new_tokens=1, pad_token_id=tokenizer.pad_token_id)
         
         print("✅ Model loaded successfully!")
         return model, tokenizer
@@ -78,6 +110,8 @@ def load_peft_model():
 
 def test_model_inference(model, tokenizer):
     """Test the model with PET-specific prompts"""
+    import torch
+
     print("\n🧪 Testing model inference...")
     
     test_prompts = [
@@ -162,10 +196,12 @@ def main():
         sys.exit(1)
     
     # Load model
-    model, tokenizer = load_peft_model()
+    profiler = StartupProfiler()
+    model, tokenizer = load_peft_model(profiler)
     if model is None:
         print("❌ Deployment failed - could not load model")
         sys.exit(1)
+    profiler.report()
     
     # Test inference
     test_model_inference(model, tokenizer)
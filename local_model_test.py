@@ -4,9 +4,8 @@ PET Local Model Test Script
 Fixes the placeholder path issue and provides comprehensive model testing
 """
 
+import argparse
 import os
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
 import sys
 
 def find_model_directory():
@@ -35,9 +34,13 @@ def find_model_directory():
     
     return None
 
-def test_model_loading(model_path):
+def test_model_loading(model_path, backend="eager"):
     """Test loading and inference with the model"""
     print(f"\n📥 Attempting to load model from: {model_path}")
+
+    # Imported here so find_model_directory() stays free of the ML stack
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
     
     try:
         # Check for config file
@@ -58,14 +61,19 @@ def test_model_loading(model_path):
             tokenizer.pad_token = tokenizer.eos_token
             print("⚠️  Set pad_token to eos_token")
         
-        print("📥 Loading model...")
-        model = AutoModelForCausalLM.from_pretrained(
-            model_path,
-            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-            device_map="auto" if torch.cuda.is_available() else None,
-            trust_remote_code=True,
-            local_files_only=True
-        )
+        print(f"📥 Loading model ({backend} backend)...")
+        if backend == "eager":
+            model = AutoModelForCausalLM.from_pretrained(
+                model_path,
+                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+                device_map="auto" if torch.cuda.is_available() else None,
+                low_cpu_mem_usage=True,
+                trust_remote_code=True,
+                local_files_only=True
+            )
+        else:
+            from pet_compiled_inference import load_model
+            model = load_model(model_path, backend)
         
         print("✅ Model loaded successfully!")
         
@@ -113,6 +121,11 @@ def test_model_loading(model_path):
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description="PET local model test")
+    parser.add_argument("--backend", choices=["eager", "onnx", "compile"], default="eager",
+                        help="Inference backend for a merged model (see pet_compiled_inference.py)")
+    args = parser.parse_args()
+
     print("🚀 PET Local Model Test")
     print("=" * 40)
     
@@ -124,7 +137,7 @@ def main():
         return
     
     # Test model loading
-    success = test_model_loading(model_path)
+    success = test_model_loading(model_path, args.backend)
     
     print("\n" + "=" * 40)
     if success:
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+PET Training Autotuner
+Probes the largest micro-batch and sequence length that fit a memory limit,
+derives gradient accumulation for a target effective batch size, and caches
+the result per hardware + model combination
+"""
+
+import hashlib
+import json
+import math
+import os
+import platform
+import resource
+import tempfile
+import time
+
+import torch
+
+CACHE_FILE = os.path.expanduser("~/.cache/pet/autotune.json")
+SEQ_LEN_CANDIDATES = (2048, 1024, 768, 512, 384, 256, 128)
+PROBE_STEPS = 2
+HEADROOM = 0.9  # Leave room for optimizer state and allocator fragmentation
+
+
+def hardware_fingerprint():
+    """Describe the device we are tuning for"""
+    if torch.cuda.is_available():
+        props = torch.cuda.get_device_properties(0)
+        return f"cuda:{props.name}:{props.total_memory // 2**20}MB"
+    return f"cpu:{platform.processor() or platform.machine()}:{os.cpu_count()}cores:{torch.get_num_threads()}threads"
+
+
+def default_memory_limit_gb(local_world_size=1):
+    """Memory budget per training process; only processes on this machine share its RAM"""
+    if torch.cuda.is_available():
+        return torch.cuda.get_device_properties(0).total_memory / 2**30 * HEADROOM
+    total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2**30
+    return total * HEADROOM / local_world_size
+
+
+def _reset_peak_memory():
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+        torch.cuda.reset_peak_memory_stats()
+        return
+    # Linux: writing 5 to clear_refs resets VmHWM (peak RSS)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_memory_gb():
+    if torch.cuda.is_available():
+        return torch.cuda.max_memory_allocated() / 2**30
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2**20
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux and never resets, so this is conservative
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**20
+
+
+def _is_oom(error):
+    return isinstance(error, MemoryError) or "out of memory" in str(error).lower()
+
+
+def probe(model, batch_size, seq_len, memory_limit_gb):
+    """
+    Run a few forward/backward passes at (batch_size, seq_len).
+    Returns tokens/sec if it fits in memory_limit_gb, else None.
+    """
+    device = next(model.parameters()).device
+    vocab_size = model.config.vocab_size
+    input_ids = torch.randint(0, vocab_size, (batch_size, seq_len), device=device)
+
+    model.train()
+    _reset_peak_memory()
+    try:
+        elapsed = 0.0
+        for step in range(PROBE_STEPS):
+            start = time.time()
+            loss = model(input_ids=input_ids, labels=input_ids).loss
+            loss.backward()
+            if step > 0:  # First step is warmup
+                elapsed += time.time() - start
+        peak = _peak_memory_gb()
+    except (RuntimeError, MemoryError) as e:
+        if not _is_oom(e):
+            raise
+        peak = None
+    finally:
+        model.zero_grad(set_to_none=True)
+        del input_ids
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    if peak is None or peak > memory_limit_gb:
+        return None
+    return batch_size * seq_len * (PROBE_STEPS - 1) / max(elapsed, 1e-9)
+
+
+def _largest_batch(model, seq_len, max_batch, memory_limit_gb):
+    """Double the batch until it stops fitting, then bisect the boundary"""
+    best, best_throughput = 0, 0.0
+    batch = 1
+    while batch <= max_batch:
+        throughput = probe(model, batch, seq_len, memory_limit_gb)
+        if throughput is None:
+            break
+        best, best_throughput = batch, throughput
+        batch *= 2
+
+    low, high = best, min(batch, max_batch + 1)
+    while high - low > 1:
+        mid = (low + high) // 2
+        throughput = probe(model, mid, seq_len, memory_limit_gb)
+        if throughput is None:
+            high = mid
+        else:
+            low, best, best_throughput = mid, mid, throughput
+    return best, best_throughput
+
+
+def required_seq_len(texts, tokenizer, max_seq_len):
+    """Smallest candidate length that covers the longest training example"""
+    longest = max(len(tokenizer(text)["input_ids"]) for text in texts)
+    fitting = [s for s in SEQ_LEN_CANDIDATES if s >= longest and s <= max_seq_len]
+    return min(fitting) if fitting else max_seq_len
+
+
+def _cache_key(model_name, memory_limit_gb, target_batch_size, seq_len, world_size):
+    raw = json.dumps([hardware_fingerprint(), model_name, round(memory_limit_gb, 1),
+                      target_batch_size, seq_len, world_size])
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def _load_cache():
+    if not os.path.exists(CACHE_FILE):
+        return {}
+    try:
+        with open(CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    cache_dir = os.path.dirname(CACHE_FILE)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Unique tmp file per process, so concurrent writers never clobber each other
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix="autotune.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, CACHE_FILE)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def autotune(model, model_name, seq_len, target_batch_size=8, memory_limit_gb=None,
+             world_size=1, local_world_size=None, use_cache=True):
+    """
+    Pick micro-batch size, sequence length and gradient accumulation.
+
+    Tries seq_len first and falls back to shorter candidates if even a
+    single sequence doesn't fit. Returns a dict with batch_size, seq_len,
+    gradient_accumulation_steps and tokens_per_second.
+
+    world_size (all ranks) sets gradient accumulation; local_world_size
+    (ranks on this machine, default world_size) splits the memory budget.
+
+    Under torch.distributed only rank 0 probes and touches the cache; the
+    result is broadcast so every rank trains with identical settings.
+    """
+    distributed = torch.distributed.is_available() and torch.distributed.is_initialized()
+    if not distributed or torch.distributed.get_world_size() == 1:
+        return _autotune_local(model, model_name, seq_len, target_batch_size,
+                               memory_limit_gb, world_size, local_world_size, use_cache)
+
+    result = [None]
+    if torch.distributed.get_rank() == 0:
+        try:
+            result[0] = _autotune_local(model, model_name, seq_len, target_batch_size,
+                                        memory_limit_gb, world_size, local_world_size, use_cache)
+        except Exception as e:
+            # Other ranks are waiting in the broadcast: tell them instead of hanging
+            result[0] = {"error": f"{type(e).__name__}: {e}"}
+    torch.distributed.broadcast_object_list(result, src=0)
+
+    if "error" in result[0]:
+        raise RuntimeError(f"Autotune failed on rank 0: {result[0]['error']}")
+    return result[0]
+
+
+def _autotune_local(model, model_name, seq_len, target_batch_size, memory_limit_gb,
+                    world_size, local_world_size, use_cache):
+    memory_limit_gb = memory_limit_gb or default_memory_limit_gb(local_world_size or world_size)
+    key = _cache_key(model_name, memory_limit_gb, target_batch_size, seq_len, world_size)
+
+    cache = _load_cache() if use_cache else {}
+    if key in cache:
+        settings = cache[key]
+        print(f"⚡ Using cached autotune settings: {settings}")
+        return settings
+
+    print(f"🔧 Autotuning for {hardware_fingerprint()} (limit {memory_limit_gb:.1f} GB)...")
+
+    # No point in a micro-batch bigger than one process' share of the effective batch
+    max_batch = max(1, target_batch_size // world_size)
+    candidates = [seq_len] + [s for s in SEQ_LEN_CANDIDATES if s < seq_len]
+
+    batch_size, throughput = 0, 0.0
+    for candidate in candidates:
+        batch_size, throughput = _largest_batch(model, candidate, max_batch, memory_limit_gb)
+        if batch_size:
+            seq_len = candidate
+            break
+        print(f"⚠️  seq_len={candidate} does not fit, trying shorter sequences")
+
+    if not batch_size:
+        raise RuntimeError(f"Even batch_size=1 at seq_len={candidates[-1]} exceeds {memory_limit_gb:.1f} GB")
+
+    settings = {
+        "batch_size": batch_size,
+        "seq_len": seq_len,
+        "gradient_accumulation_steps": math.ceil(target_batch_size / (batch_size * world_size)),
+        "tokens_per_second": round(throughput, 1),
+    }
+    print(f"✅ Autotune result: {settings}")
+
+    if use_cache:
+        cache = _load_cache()
+        cache[key] = settings
+        _save_cache(cache)
+    return settings
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+PET Checkpointing - Adapter-only, asynchronous checkpoints with auto-resume
+Saves LoRA weights + optimizer/scheduler/RNG state in the Trainer's own
+checkpoint layout, so `trainer.train(resume_from_checkpoint=...)` can pick it up
+"""
+
+import dataclasses
+import json
+import os
+import random
+import re
+import shutil
+import threading
+
+import torch
+from safetensors.torch import save_file
+from transformers import TrainerCallback
+
+CHECKPOINT_PREFIX = "checkpoint-"
+CHECKPOINT_PATTERN = re.compile(rf"^{CHECKPOINT_PREFIX}(\d+)$")
+
+ADAPTER_WEIGHTS_NAME = "adapter_model.safetensors"
+OPTIMIZER_NAME = "optimizer.pt"
+SCHEDULER_NAME = "scheduler.pt"
+RNG_STATE_NAME = "rng_state.pth"
+RNG_STATE_RANK_NAME = "rng_state_{rank}.pth"  # Per-rank name Trainer loads under DDP
+TRAINER_STATE_NAME = "trainer_state.json"
+
+REQUIRED_FILES = (ADAPTER_WEIGHTS_NAME, OPTIMIZER_NAME, TRAINER_STATE_NAME)
+
+
+def _to_cpu(obj):
+    """Recursively copy every tensor in a (nested) state dict to CPU"""
+    if torch.is_tensor(obj):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: _to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_to_cpu(v) for v in obj)
+    return obj
+
+
+def _rng_state():
+    """Capture RNG state in the format Trainer._load_rng_state expects"""
+    state = {
+        "python": random.getstate(),
+        "cpu": torch.random.get_rng_state(),
+    }
+    try:
+        import numpy as np
+        state["numpy"] = np.random.get_state()
+    except ImportError:
+        pass
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.random.get_rng_state_all()
+    return state
+
+
+def _distributed():
+    return torch.distributed.is_available() and torch.distributed.is_initialized()
+
+
+def _gather_rng_states():
+    """RNG state of every rank (collective: all ranks must call this)"""
+    if not _distributed() or torch.distributed.get_world_size() == 1:
+        return [_rng_state()]
+    states = [None] * torch.distributed.get_world_size()
+    torch.distributed.all_gather_object(states, _rng_state())
+    return states
+
+
+def _trainable_state_dict(model):
+    """Return only the trainable (LoRA) weights of the model"""
+    try:
+        from peft import get_peft_model_state_dict
+        if hasattr(model, "peft_config"):
+            return get_peft_model_state_dict(model)
+    except ImportError:
+        pass
+    trainable = {name for name, p in model.named_parameters() if p.requires_grad}
+    return {k: v for k, v in model.state_dict().items() if k in trainable}
+
+
+def is_valid_checkpoint(path):
+    """A checkpoint is valid once it was atomically renamed into place"""
+    return os.path.isdir(path) and all(
+        os.path.exists(os.path.join(path, name)) for name in REQUIRED_FILES
+    )
+
+
+def list_checkpoints(output_dir):
+    """List valid checkpoints in output_dir, oldest first"""
+    if not os.path.isdir(output_dir):
+        return []
+
+    found = []
+    for name in os.listdir(output_dir):
+        match = CHECKPOINT_PATTERN.match(name)
+        path = os.path.join(output_dir, name)
+        if match and is_valid_checkpoint(path):
+            found.append((int(match.group(1)), path))
+    return [path for _, path in sorted(found)]
+
+
+def find_latest_checkpoint(output_dir):
+    """
+    Return the newest valid checkpoint in output_dir, or None.
+
+    Under torch.distributed, rank 0 picks the checkpoint and broadcasts it so
+    every rank resumes from the same step; it must be readable on all ranks.
+    """
+    checkpoints = list_checkpoints(output_dir)
+    latest = checkpoints[-1] if checkpoints else None
+
+    if _distributed():
+        choice = [latest]
+        torch.distributed.broadcast_object_list(choice, src=0)
+        latest = choice[0]
+
+        visible = [None] * torch.distributed.get_world_size()
+        torch.distributed.all_gather_object(visible, latest is None or is_valid_checkpoint(latest))
+        missing = [rank for rank, ok in enumerate(visible) if not ok]
+        if missing:
+            raise RuntimeError(
+                f"Checkpoint {latest} is not readable on ranks {missing} - "
+                "--output-dir must be on a filesystem shared by all nodes"
+            )
+
+    if latest:
+        print(f"♻️  Resuming from checkpoint: {latest}")
+    return latest
+
+
+class AsyncCheckpointCallback(TrainerCallback):
+    """
+    Snapshot trainable weights + optimizer state on the training thread,
+    then write them to disk from a background thread.
+
+    Use with `save_strategy="no"` so the Trainer never writes full checkpoints.
+    """
+
+    def __init__(self, output_dir, save_steps=50, save_total_limit=3):
+        self.output_dir = output_dir
+        self.save_steps = save_steps
+        self.save_total_limit = save_total_limit
+        self._writer = None
+        self._error = None
+
+    def on_step_end(self, args, state, control, model=None, optimizer=None,
+                    lr_scheduler=None, **kwargs):
+        if state.global_step % self.save_steps != 0:
+            return
+        self.save(state, model, optimizer, lr_scheduler)
+
+    def on_train_end(self, args, state, control, model=None, optimizer=None,
+                     lr_scheduler=None, **kwargs):
+        if state.global_step % self.save_steps != 0:
+            self.save(state, model, optimizer, lr_scheduler)
+        self.wait()
+
+    def save(self, state, model, optimizer, lr_scheduler):
+        """Snapshot current training state and hand it to the writer thread"""
+        # Collective, so it runs on every rank before non-zero ranks bail out
+        rng_states = _gather_rng_states()
+        if not state.is_world_process_zero:
+            return
+
+        # Only one write in flight keeps at most two snapshots in memory
+        self.wait()
+
+        snapshot = {
+            "step": state.global_step,
+            "adapter": _to_cpu(_trainable_state_dict(model)),
+            "optimizer": _to_cpu(optimizer.state_dict()) if optimizer else None,
+            "scheduler": lr_scheduler.state_dict() if lr_scheduler else None,
+            "rng": rng_states,
+            "trainer_state": json.dumps(dataclasses.asdict(state), indent=2, sort_keys=True) + "\n",
+            "adapter_config": getattr(model, "peft_config", None),
+        }
+
+        self._writer = threading.Thread(
+            target=self._write, args=(snapshot,), name="pet-checkpoint-writer", daemon=True
+        )
+        self._writer.start()
+
+    def wait(self):
+        """Block until the in-flight checkpoint (if any) is on disk"""
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            print(f"❌ Checkpoint write failed: {error}")
+
+    def _write(self, snapshot):
+        final_dir = os.path.join(self.output_dir, f"{CHECKPOINT_PREFIX}{snapshot['step']}")
+        tmp_dir = final_dir + ".tmp"
+
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+
+            save_file(
+                {k: v.contiguous() for k, v in snapshot["adapter"].items()},
+                os.path.join(tmp_dir, ADAPTER_WEIGHTS_NAME),
+                metadata={"format": "pt"},
+            )
+
+            if snapshot["adapter_config"]:
+                for adapter_config in snapshot["adapter_config"].values():
+                    adapter_config.save_pretrained(tmp_dir)
+
+            torch.save(snapshot["optimizer"], os.path.join(tmp_dir, OPTIMIZER_NAME))
+            if snapshot["scheduler"] is not None:
+                torch.save(snapshot["scheduler"], os.path.join(tmp_dir, SCHEDULER_NAME))
+            if len(snapshot["rng"]) == 1:
+                torch.save(snapshot["rng"][0], os.path.join(tmp_dir, RNG_STATE_NAME))
+            else:
+                for rank, rng_state in enumerate(snapshot["rng"]):
+                    torch.save(rng_state, os.path.join(tmp_dir, RNG_STATE_RANK_NAME.format(rank=rank)))
+
+            # Trainer state last: its presence marks the checkpoint complete
+            with open(os.path.join(tmp_dir, TRAINER_STATE_NAME), "w") as f:
+                f.write(snapshot["trainer_state"])
+
+            shutil.rmtree(final_dir, ignore_errors=True)
+            os.replace(tmp_dir, final_dir)
+            print(f"💾 Checkpoint saved: {final_dir}")
+
+            self._rotate()
+        except Exception as e:
+            self._error = e
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _rotate(self):
+        """Keep only the newest save_total_limit checkpoints"""
+        if not self.save_total_limit:
+            return
+        checkpoints = list_checkpoints(self.output_dir)
+        for path in checkpoints[:-self.save_total_limit]:
+            shutil.rmtree(path, ignore_errors=True)
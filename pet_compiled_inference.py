@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+PET Compiled CPU Inference
+Optional ONNX Runtime (KV-cache export via optimum) and torch.compile
+(static KV cache) backends for the merged PET model, with an eager-parity
+check and a speedup report on the PET prompts
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BACKENDS = ("eager", "onnx", "compile")
+
+PET_PROMPTS = [
+    "<|im_start|>user\nWhat are the key principles of effective prompt engineering?<|im_end|>\n<|im_start|>assistant\n",
+    "<|im_start|>user\nExplain few-shot prompting with an example.<|im_end|>\n<|im_start|>assistant\n",
+    "<|im_start|>user\nHow can I improve prompt clarity and specificity?<|im_end|>\n<|im_start|>assistant\n",
+    "<|im_start|>user\nExplain chain-of-thought prompting.<|im_end|>\n<|im_start|>assistant\n",
+]
+
+
+def merge_adapter(adapter_path, output_dir):
+    """Merge a LoRA adapter into its base model so it can be exported/compiled"""
+    import json
+    import torch
+    from peft import PeftModel
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    with open(os.path.join(adapter_path, "adapter_config.json"), "r") as f:
+        base_name = json.load(f)["base_model_name_or_path"]
+
+    print(f"🔗 Merging {adapter_path} into {base_name}...")
+    base_model = AutoModelForCausalLM.from_pretrained(base_name, torch_dtype=torch.float32)
+    model = PeftModel.from_pretrained(base_model, adapter_path).merge_and_unload()
+    model.save_pretrained(output_dir)
+    AutoTokenizer.from_pretrained(base_name).save_pretrained(output_dir)
+    print(f"✅ Merged model saved: {output_dir}")
+    return output_dir
+
+
+def load_model(model_path, backend="eager", threads=None):
+    """
+    Load the merged PET model with the requested backend.
+    Every backend returns an object with a transformers-style generate().
+    """
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    threads = threads or torch.get_num_threads()
+
+    if backend == "onnx":
+        try:
+            import onnxruntime as ort
+            from optimum.onnxruntime import ORTModelForCausalLM
+        except ImportError:
+            print("❌ ONNX backend needs: pip3 install optimum[onnxruntime]")
+            raise
+
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = threads
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        # Export once (past_key_values as graph inputs/outputs), then reuse
+        onnx_path = model_path.rstrip("/") + "-onnx"
+        export = not os.path.exists(os.path.join(onnx_path, "model.onnx"))
+        if export:
+            print(f"📦 Exporting ONNX model with KV cache to {onnx_path}...")
+        model = ORTModelForCausalLM.from_pretrained(
+            model_path if export else onnx_path,
+            export=export,
+            use_cache=True,
+            provider="CPUExecutionProvider",
+            session_options=session_options,
+        )
+        if export:
+            model.save_pretrained(onnx_path)
+        return model
+
+    torch.set_num_threads(threads)
+    model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype=torch.float32)
+    model.eval()
+
+    if backend == "compile":
+        # Static cache keeps decode-step shapes fixed, so the graph compiles once.
+        # "reduce-overhead" means CUDA graphs, which does nothing on CPU.
+        model.generation_config.cache_implementation = "static"
+        model.forward = torch.compile(model.forward, mode="max-autotune-no-cudagraphs", fullgraph=True)
+    return model
+
+
+def greedy_generate(model, tokenizer, prompt, max_new_tokens):
+    """Greedy decode; returns (new token ids, seconds)"""
+    import torch
+
+    inputs = tokenizer(prompt, return_tensors="pt")
+    start = time.time()
+    with torch.no_grad():
+        outputs = model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            do_sample=False,
+            pad_token_id=tokenizer.pad_token_id,
+            eos_token_id=tokenizer.eos_token_id,
+        )
+    elapsed = time.time() - start
+    return outputs[0][inputs["input_ids"].shape[1]:].tolist(), elapsed
+
+
+def compare_backends(model_path, backend, prompts=PET_PROMPTS, max_new_tokens=64, threads=None):
+    """
+    Run the PET prompts through eager and `backend`.
+    Parity means identical greedy tokens; speedup is eager time / backend time.
+    """
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    timings = {}
+    tokens = {}
+    for name in ("eager", backend):
+        print(f"\n📥 Loading {name} backend...")
+        model = load_model(model_path, name, threads)
+
+        # Warmup on every prompt: each prefill length is its own torch.compile
+        # graph, and compiling inside the timed loop would skew the speedup
+        for prompt in prompts:
+            greedy_generate(model, tokenizer, prompt, max_new_tokens)
+
+        tokens[name], timings[name] = [], 0.0
+        for prompt in prompts:
+            ids, elapsed = greedy_generate(model, tokenizer, prompt, max_new_tokens)
+            tokens[name].append(ids)
+            timings[name] += elapsed
+        print(f"⏱️  {name}: {timings[name]:.2f}s for {len(prompts)} prompts")
+        del model
+
+    mismatches = [i for i, (a, b) in enumerate(zip(tokens["eager"], tokens[backend])) if a != b]
+    speedup = timings["eager"] / timings[backend] if timings[backend] else 0.0
+
+    print("\n📈 Compiled backend report")
+    print(f"   Backend:  {backend}")
+    print(f"   Parity:   {len(prompts) - len(mismatches)}/{len(prompts)} prompts identical to eager")
+    print(f"   Speedup:  {speedup:.2f}x over eager")
+    for i in mismatches:
+        a, b = tokens["eager"][i], tokens[backend][i]
+        diverge = next((j for j, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+        print(f"   ⚠️  Prompt {i + 1} diverges at token {diverge}")
+
+    return {"parity": not mismatches, "mismatches": mismatches, "speedup": speedup, "timings": timings}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compiled CPU inference for the merged PET model")
+    parser.add_argument("model_path", help="Merged PET model directory")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="onnx")
+    parser.add_argument("--merge-from", help="LoRA adapter to merge into model_path first")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--threads", type=int)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("🚀 PET Compiled Inference Benchmark")
+    print("=" * 50)
+
+    if args.merge_from and not os.path.exists(os.path.join(args.model_path, "config.json")):
+        merge_adapter(args.merge_from, args.model_path)
+
+    report = compare_backends(args.model_path, args.backend,
+                              max_new_tokens=args.max_new_tokens, threads=args.threads)
+    if not report["parity"]:
+        print("❌ Parity check failed - compiled outputs differ from eager")
+        return False
+    print("✅ Parity check passed")
+    return True
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+PET Synthetic Training Data Generator
+Fans out seed heart prompts x PET rules to a local teacher model (Ollama API
+or in-process transformers), validates + deduplicates the answers and streams
+accepted examples to ChatML JSONL, resumable via a progress file
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+PET_SYSTEM_PROMPT = (
+    "You are PET (Prompt Engineering Tetris), an expert AI assistant specializing in advanced "
+    "prompt engineering techniques. You have deep knowledge of 38 sophisticated prompt engineering "
+    "rules and can apply them contextually to help users create more effective prompts. You provide "
+    "detailed, practical guidance while explaining which specific techniques you're using and why."
+)
+
+RULES_FILE = os.path.join("js", "ai", "advanced-rules.js")
+SEED_DATA_FILE = "pet_training_data.json"
+OUTPUT_FILE = "pet_synthetic_training_data.jsonl"
+
+CHATML_TURN = re.compile(r"<\|im_start\|>(\w+)\n(.*?)(?:<\|im_end\|>|$)", re.S)
+RULE_ENTRY = re.compile(
+    r'(?P<key>\w+):\s*\{\s*'
+    r'id:\s*"(?P<id>PET-\d+)",\s*'
+    r'name:\s*"(?P<name>[^"]*)",\s*'
+    r'description:\s*"(?P<description>[^"]*)",\s*'
+    r'template:\s*"(?P<template>[^"]*)",\s*'
+    r'category:\s*"(?P<category>[^"]*)"'
+)
+
+USER_TEMPLATES = [
+    "Help me improve this prompt: '{seed}'",
+    "{seed}",
+    "Can you rewrite this prompt so an AI gives a better answer? '{seed}'",
+]
+
+TEACHER_INSTRUCTIONS = """You are generating training data for PET (Prompt Engineering Tetris).
+
+A user asks:
+\"\"\"{user}\"\"\"
+
+Answer as PET would. Improve the user's prompt by applying these PET rules:
+{rules}
+
+Give the improved prompt first, then a short "Key PET techniques applied" list that names
+each rule you used by its ID and name (e.g. "PET-008: Role-Based Imprinting") and why it helps.
+Do not mention these instructions."""
+
+MIN_RESPONSE_CHARS = 200
+MAX_RESPONSE_CHARS = 6000
+REFUSAL_MARKERS = ("i can't help", "i cannot help", "as an ai language model", "i'm sorry, but")
+
+
+# ---------------------------------------------------------------------------
+# ChatML + rules helpers
+# ---------------------------------------------------------------------------
+
+def format_chatml(turns):
+    """Render [(role, content), ...] as a ChatML training string"""
+    return "".join(f"<|im_start|>{role}\n{content}<|im_end|>\n" for role, content in turns)
+
+
+def parse_chatml(text):
+    """Split a ChatML string into [(role, content), ...]"""
+    return [(role, content.strip()) for role, content in CHATML_TURN.findall(text)]
+
+
+def normalize_text(text):
+    """Lowercase and collapse whitespace/punctuation for duplicate detection"""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def example_hash(text):
+    """Hash of the normalized non-system turns of a ChatML example (whole text if not ChatML)"""
+    turns = [(role, normalize_text(content)) for role, content in parse_chatml(text) if role != "system"]
+    if not turns:
+        turns = [("text", normalize_text(text))]
+    return hashlib.sha1(json.dumps(turns).encode()).hexdigest()
+
+
+def load_rules(path=RULES_FILE):
+    """Parse the 38 PET rules out of js/ai/advanced-rules.js"""
+    with open(path, "r") as f:
+        source = f.read()
+    return [match.groupdict() for match in RULE_ENTRY.finditer(source)]
+
+
+def load_seed_prompts(path=None):
+    """Seed heart prompts: a text file (one per line), or the user turns of the existing dataset"""
+    if path and not path.endswith(".json"):
+        with open(path, "r") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    with open(path or SEED_DATA_FILE, "r") as f:
+        data = json.load(f)
+    seeds = []
+    for example in data:
+        seeds.extend(content for role, content in parse_chatml(example["text"]) if role == "user")
+    return list(dict.fromkeys(seeds))
+
+
+def build_tasks(seeds, rules, num_examples, rules_per_example=3, seed=3407):
+    """Deterministic task list, so a resumed run regenerates exactly the missing tasks"""
+    rng = random.Random(seed)
+    tasks = []
+    for task_id in range(num_examples):
+        heart = seeds[task_id % len(seeds)]
+        tasks.append({
+            "task_id": task_id,
+            "user": rng.choice(USER_TEMPLATES).format(seed=heart),
+            "rules": rng.sample(rules, min(rules_per_example, len(rules))),
+        })
+    return tasks
+
+
+def teacher_prompt(task):
+    rules = "\n".join(f"- {r['id']}: {r['name']} - {r['description']}" for r in task["rules"])
+    return TEACHER_INSTRUCTIONS.format(user=task["user"], rules=rules)
+
+
+def validate_response(task, response):
+    """Return None if the response is acceptable, else a short rejection reason"""
+    response = (response or "").strip()
+    if len(response) < MIN_RESPONSE_CHARS:
+        return "too_short"
+    if len(response) > MAX_RESPONSE_CHARS:
+        return "too_long"
+    if "<|im_" in response:
+        return "chatml_leak"
+    lowered = response.lower()
+    if any(marker in lowered for marker in REFUSAL_MARKERS):
+        return "refusal"
+    if not any(r["id"].lower() in lowered or r["name"].lower() in lowered for r in task["rules"]):
+        return "no_rule_mentioned"
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Teachers
+# ---------------------------------------------------------------------------
+
+class OllamaTeacher:
+    """Teacher served over the Ollama /api/generate endpoint (concurrent HTTP requests)"""
+
+    def __init__(self, model, base_url="http://localhost:11434", concurrency=8,
+                 temperature=0.7, max_tokens=700, timeout=300, retries=3):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.options = {"temperature": temperature, "num_predict": max_tokens, "top_p": 0.9}
+        self.timeout = timeout
+        self.retries = retries
+
+    def _generate_one(self, prompt):
+        body = json.dumps({
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "options": self.options,
+        }).encode()
+        request = urllib.request.Request(
+            f"{self.base_url}/api/generate", data=body, headers={"Content-Type": "application/json"}
+        )
+        for attempt in range(self.retries + 1):
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    return json.loads(response.read())["response"]
+            except Exception as e:
+                if attempt == self.retries:
+                    # None means "no answer": the task stays pending for the next run
+                    print(f"⚠️  Ollama request failed after {attempt + 1} attempts: {e}")
+                    return None
+                time.sleep(2 ** attempt)
+
+    def stream(self, prompts):
+        """
+        Yield (index, response) as each request finishes. One long-lived pool
+        keeps `concurrency` requests in flight, so a long generation never
+        holds back the others.
+        """
+        pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            futures = {pool.submit(self._generate_one, prompt): i for i, prompt in enumerate(prompts)}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Interrupted: drop queued requests instead of sending them all first
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+class TransformersTeacher:
+    """In-process teacher; concurrency comes from batched generation"""
+
+    def __init__(self, model_path, concurrency=8, temperature=0.7, max_tokens=700):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self.torch = torch
+        self.concurrency = concurrency
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path, padding_side="left")
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(
+            model_path,
+            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+            device_map="auto" if torch.cuda.is_available() else None,
+        )
+        self.model.eval()
+
+    def stream(self, prompts):
+        """Yield (index, response) one generation batch at a time"""
+        for start in range(0, len(prompts), self.concurrency):
+            batch = prompts[start:start + self.concurrency]
+            yield from enumerate(self.generate(batch), start)
+
+    def generate(self, prompts):
+        formatted = [format_chatml([("user", p)]) + "<|im_start|>assistant\n" for p in prompts]
+        inputs = self.tokenizer(formatted, return_tensors="pt", padding=True).to(self.model.device)
+        with self.torch.no_grad():
+            outputs = self.model.generate(
+                **inputs,
+                max_new_tokens=self.max_tokens,
+                do_sample=True,
+                temperature=self.temperature,
+                pad_token_id=self.tokenizer.pad_token_id,
+            )
+        new_tokens = outputs[:, inputs["input_ids"].shape[1]:]
+        return self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+
+# ---------------------------------------------------------------------------
+# Pipeline
+# ---------------------------------------------------------------------------
+
+def _drop_partial_line(path, block_size=1 << 16):
+    """Truncate an interrupted write (anything after the last newline) so appends start on a fresh line"""
+    with open(path, "rb+") as f:
+        end = pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            step = min(pos, block_size)
+            f.seek(pos - step)
+            newline = f.read(step).rfind(b"\n")
+            if newline != -1:
+                pos += newline + 1 - step
+                break
+            pos -= step
+        if pos != end:
+            print(f"⚠️  Dropping {end - pos} bytes of an interrupted write from {path}")
+            f.truncate(pos)
+
+
+def _load_progress(output_file, progress_file):
+    """Task ids already handled and hashes of examples already written"""
+    done, seen = set(), set()
+    if os.path.exists(progress_file):
+        _drop_partial_line(progress_file)
+        with open(progress_file, "r") as f:
+            done.update(int(line) for line in f if line.strip())
+    if os.path.exists(output_file):
+        _drop_partial_line(output_file)
+        with open(output_file, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                done.add(record["task_id"])
+                seen.add(example_hash(record["text"]))
+    return done, seen
+
+
+def generate_dataset(teacher, tasks, output_file=OUTPUT_FILE, progress_file=None, report_every=50):
+    """Run all pending tasks through the teacher and stream accepted examples to output_file"""
+    progress_file = progress_file or output_file + ".progress"
+    done, seen = _load_progress(output_file, progress_file)
+    pending = [t for t in tasks if t["task_id"] not in done]
+
+    print(f"📊 {len(tasks)} tasks, {len(done)} already done, {len(pending)} pending")
+    stats = {"accepted": 0, "duplicate": 0}
+    start = time.time()
+    last_report = 0
+
+    with open(output_file, "a") as out, open(progress_file, "a") as progress:
+        prompts = [teacher_prompt(t) for t in pending]
+        for handled, (index, response) in enumerate(teacher.stream(prompts), 1):
+            task = pending[index]
+            if response is None:
+                # No teacher answer: not recorded, so a rerun retries the task
+                stats["transport_error"] = stats.get("transport_error", 0) + 1
+            else:
+                reason = validate_response(task, response)
+                if reason is None:
+                    text = format_chatml([
+                        ("system", PET_SYSTEM_PROMPT),
+                        ("user", task["user"]),
+                        ("assistant", response.strip()),
+                    ])
+                    digest = example_hash(text)
+                    if digest in seen:
+                        reason = "duplicate"
+                    else:
+                        seen.add(digest)
+                        record = {
+                            "text": text,
+                            "task_id": task["task_id"],
+                            "rules": [r["id"] for r in task["rules"]],
+                        }
+                        out.write(json.dumps(record) + "\n")
+                        out.flush()
+                        reason = "accepted"
+                stats[reason] = stats.get(reason, 0) + 1
+
+                # Example first, then progress: a crash can only cause a retry, never a loss
+                progress.write(f"{task['task_id']}\n")
+                progress.flush()
+
+            if handled - last_report >= report_every or handled == len(pending):
+                last_report = handled
+                minutes = (time.time() - start) / 60
+                rate = stats["accepted"] / minutes if minutes else 0.0
+                print(f"⚡ {handled}/{len(pending)} tasks | {stats['accepted']} accepted | "
+                      f"{rate:.1f} examples/min")
+
+    minutes = (time.time() - start) / 60
+    stats["examples_per_minute"] = round(stats["accepted"] / minutes, 1) if minutes else 0.0
+    return stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic PET training data")
+    parser.add_argument("--num-examples", type=int, default=2000)
+    parser.add_argument("--backend", choices=["ollama", "transformers"], default="ollama")
+    parser.add_argument("--model", default="gemma3n:e2b",
+                        help="Ollama model name, or model path for --backend transformers")
+    parser.add_argument("--ollama-url", default="http://localhost:11434")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Parallel Ollama requests, or generation batch size")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per failed Ollama request")
+    parser.add_argument("--seeds", help="Seed prompts (.txt one per line, or ChatML .json)")
+    parser.add_argument("--rules-per-example", type=int, default=3)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--seed", type=int, default=3407)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("🚀 PET Synthetic Data Generation")
+    print("=" * 50)
+
+    rules = load_rules()
+    seeds = load_seed_prompts(args.seeds)
+    print(f"📋 {len(rules)} rules, {len(seeds)} seed prompts")
+    if not rules or not seeds:
+        print("❌ Need at least one rule and one seed prompt")
+        return False
+
+    tasks = build_tasks(seeds, rules, args.num_examples, args.rules_per_example, args.seed)
+
+    if args.backend == "ollama":
+        teacher = OllamaTeacher(args.model, args.ollama_url, concurrency=args.concurrency,
+                                retries=args.retries)
+    else:
+        teacher = TransformersTeacher(args.model, concurrency=args.concurrency)
+
+    stats = generate_dataset(teacher, tasks, args.output)
+
+    print("\n" + "=" * 50)
+    print(f"✅ Accepted: {stats['accepted']} examples -> {args.output}")
+    rejected = {k: v for k, v in stats.items()
+                if k not in ("accepted", "transport_error", "examples_per_minute")}
+    if rejected:
+        print(f"🗑️  Rejected: {rejected}")
+    if stats.get("transport_error"):
+        print(f"🔄 {stats['transport_error']} tasks got no teacher answer - rerun to retry them")
+    print(f"⚡ Throughput: {stats['examples_per_minute']} examples/min")
+    return True
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
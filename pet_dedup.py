@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+PET Training Corpus Deduplication
+Removes exact duplicates (hash of normalized ChatML turns) and near-duplicates
+(MinHash + LSH) from JSON / JSONL corpora. Signatures are computed in parallel
+worker processes over bounded windows; kept examples stream straight to disk
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+from itertools import islice
+
+import numpy as np
+
+from pet_data_generation import example_hash, normalize_text, parse_chatml
+
+OUTPUT_FILE = "pet_training_data_dedup.jsonl"
+REPORT_FILE = "pet_dedup_report.json"
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+WINDOW_SIZE = 20000  # Records in flight at once; bounds memory for any corpus size
+READ_CHUNK_CHARS = 1 << 20
+PREVIEW_CHARS = 120
+
+# Set in each worker by _init_worker
+_PERMUTATIONS = None
+_CONFIG = None
+
+
+def iter_records(paths):
+    """Yield raw JSON strings, one per example, from .json lists or .jsonl files"""
+    for path in paths:
+        with open(path, "r") as f:
+            if path.endswith(".jsonl"):
+                for line in f:
+                    if line.strip():
+                        yield line.strip()
+            else:
+                for record in _iter_json_array(f, path):
+                    yield json.dumps(record)
+
+
+def _iter_json_array(f, path):
+    """Incrementally decode a top-level JSON list, so .json corpora never load whole"""
+    decoder = json.JSONDecoder()
+    buffer, started = "", False
+    while True:
+        chunk = f.read(READ_CHUNK_CHARS)
+        buffer += chunk
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError(f"{path}: expected a JSON list of records")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if not chunk:
+                    raise
+                break  # Record continues in the next chunk
+            yield record
+        buffer = buffer[pos:]
+        if not chunk:
+            raise ValueError(f"{path}: unterminated JSON list")
+
+
+def make_permutations(num_perm, seed=1):
+    """Random (a, b) pairs for the MinHash hash family h(x) = (a*x + b) mod p"""
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def shingles(text, size):
+    """Word n-gram shingles of the normalized text, hashed to 32 bits"""
+    words = text.split()
+    if len(words) <= size:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.fromiter((zlib.crc32(g.encode()) for g in set(grams)), dtype=np.uint64)
+
+
+def minhash(hashes, permutations):
+    a, b = permutations
+    # a, b and hashes are < 2**32, so a*x + b cannot overflow uint64
+    values = (np.outer(hashes, a) + b) % MERSENNE_PRIME & MAX_HASH
+    return values.min(axis=0).astype(np.uint32)
+
+
+def lsh_bands(signature, bands):
+    """
+    One 64-bit key per band (list position = band); equal keys mean candidate
+    near-duplicates. Ints keep the per-band bucket dicts small.
+    """
+    rows = len(signature) // bands
+    return [
+        int.from_bytes(hashlib.blake2b(signature[i * rows:(i + 1) * rows].tobytes(), digest_size=8).digest(),
+                       "little")
+        for i in range(bands)
+    ]
+
+
+def _init_worker(num_perm, shingle_size, bands):
+    global _PERMUTATIONS, _CONFIG
+    _PERMUTATIONS = make_permutations(num_perm)
+    _CONFIG = {"shingle_size": shingle_size, "bands": bands}
+
+
+def _process(raw):
+    """Worker: exact hash, MinHash signature and LSH band keys for one record"""
+    text = json.loads(raw)["text"]
+    turns = parse_chatml(text)
+    content = " ".join(normalize_text(c) for role, c in turns if role != "system")
+    signature = minhash(shingles(content or normalize_text(text), _CONFIG["shingle_size"]), _PERMUTATIONS)
+    # example_hash falls back to the whole text for non-ChatML records, like the MinHash above
+    return raw, example_hash(text), signature, lsh_bands(signature, _CONFIG["bands"]), bool(turns)
+
+
+def _preview(raw):
+    text = json.loads(raw)["text"]
+    users = [c for role, c in parse_chatml(text) if role == "user"]
+    return (users[0] if users else text)[:PREVIEW_CHARS]
+
+
+def deduplicate(paths, output_file=OUTPUT_FILE, threshold=0.8, num_perm=128, bands=16,
+                shingle_size=5, workers=None):
+    """
+    Stream every record through exact + near-duplicate detection.
+    Kept records go to output_file; returns (stats, clusters) for the report.
+    """
+    if num_perm % bands:
+        raise ValueError("num_perm must be divisible by bands")
+
+    exact_seen = {}      # exact hash -> index of kept record
+    buckets = [{} for _ in range(bands)]  # per band: key -> index of first kept record
+    signatures = {}      # index of kept record -> MinHash signature
+    clusters = {}        # index of kept record -> removed members
+    stats = {"input": 0, "kept": 0, "exact_duplicates": 0, "near_duplicates": 0, "non_chatml": 0}
+
+    workers = workers or os.cpu_count() or 1
+    records = iter_records(paths)
+    start = time.time()
+
+    with multiprocessing.Pool(workers, _init_worker, (num_perm, shingle_size, bands)) as pool, \
+            open(output_file, "w") as out:
+        while True:
+            window = list(islice(records, WINDOW_SIZE))
+            if not window:
+                break
+
+            for raw, exact, signature, band_keys, is_chatml in pool.imap(_process, window, chunksize=256):
+                index = stats["input"]
+                stats["input"] += 1
+                if not is_chatml:
+                    stats["non_chatml"] += 1
+
+                if exact in exact_seen:
+                    stats["exact_duplicates"] += 1
+                    clusters.setdefault(exact_seen[exact], []).append(
+                        {"index": index, "type": "exact", "similarity": 1.0, "preview": _preview(raw)}
+                    )
+                    continue
+
+                # Verify LSH candidates with the estimated Jaccard similarity
+                best, best_similarity = None, 0.0
+                candidates = {buckets[band][key] for band, key in enumerate(band_keys) if key in buckets[band]}
+                for candidate in candidates:
+                    similarity = float(np.mean(signatures[candidate] == signature))
+                    if similarity > best_similarity:
+                        best, best_similarity = candidate, similarity
+
+                if best is not None and best_similarity >= threshold:
+                    stats["near_duplicates"] += 1
+                    clusters.setdefault(best, []).append(
+                        {"index": index, "type": "near", "similarity": round(best_similarity, 3),
+                         "preview": _preview(raw)}
+                    )
+                    continue
+
+                out.write(raw + "\n")
+                stats["kept"] += 1
+                exact_seen[exact] = index
+                signatures[index] = signature
+                for band, key in enumerate(band_keys):
+                    buckets[band].setdefault(key, index)
+
+            elapsed = time.time() - start
+            print(f"⚡ {stats['input']} examples | {stats['kept']} kept | "
+                  f"{stats['input'] / elapsed:.0f} examples/s")
+
+    stats["seconds"] = round(time.time() - start, 1)
+    return stats, clusters
+
+
+def write_report(stats, clusters, report_file=REPORT_FILE):
+    """Clusters are keyed by the input index of the kept representative"""
+    report = {
+        "stats": stats,
+        "clusters": [
+            {"representative": index, "removed": removed}
+            for index, removed in sorted(clusters.items(), key=lambda item: -len(item[1]))
+        ],
+    }
+    with open(report_file, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Remove exact and near-duplicate PET training examples")
+    parser.add_argument("inputs", nargs="+", help="Training corpora (.json lists or ChatML .jsonl)")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--report", default=REPORT_FILE)
+    parser.add_argument("--threshold", type=float, default=0.8, help="Jaccard similarity for near-duplicates")
+    parser.add_argument("--num-perm", type=int, default=128)
+    parser.add_argument("--bands", type=int, default=16)
+    parser.add_argument("--shingle-size", type=int, default=5, help="Words per shingle")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("🚀 PET Corpus Deduplication")
+    print("=" * 50)
+
+    stats, clusters = deduplicate(
+        args.inputs,
+        output_file=args.output,
+        threshold=args.threshold,
+        num_perm=args.num_perm,
+        bands=args.bands,
+        shingle_size=args.shingle_size,
+        workers=args.workers,
+    )
+    write_report(stats, clusters, args.report)
+
+    print("\n" + "=" * 50)
+    print(f"✅ Kept {stats['kept']}/{stats['input']} examples -> {args.output}")
+    print(f"🗑️  Exact duplicates: {stats['exact_duplicates']}, near-duplicates: {stats['near_duplicates']}")
+    if stats["non_chatml"]:
+        print(f"⚠️  {stats['non_chatml']} records had no ChatML turns (compared as plain text)")
+    print(f"📋 Cluster report: {args.report} ({len(clusters)} clusters)")
+    print(f"⏱️  {stats['seconds']}s")
+    return True
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
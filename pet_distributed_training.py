@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+PET Distributed CPU Training Launcher
+Runs pet_training_script.py as N data-parallel worker processes (gloo backend),
+each pinned to its own slice of cores, and reports scaling efficiency
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+TRAINING_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pet_training_script.py")
+
+
+def available_cores():
+    """Cores this process is allowed to run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def split_cores(cores, nproc):
+    """Split cores into nproc contiguous, equally sized slices"""
+    per_worker = len(cores) // nproc
+    if per_worker == 0:
+        raise ValueError(f"Cannot run {nproc} workers on {len(cores)} cores")
+    return [cores[i * per_worker:(i + 1) * per_worker] for i in range(nproc)]
+
+
+def launch_workers(nproc, script_args, nnodes=1, node_rank=0,
+                   master_addr="127.0.0.1", master_port=29500, cores=None):
+    """Start one training process per core slice and wait for all of them"""
+    slices = split_cores(cores or available_cores(), nproc)
+    world_size = nnodes * nproc
+
+    processes = []
+    for local_rank, worker_cores in enumerate(slices):
+        rank = node_rank * nproc + local_rank
+        threads = str(len(worker_cores))
+
+        env = dict(
+            os.environ,
+            RANK=str(rank),
+            LOCAL_RANK=str(local_rank),
+            WORLD_SIZE=str(world_size),
+            LOCAL_WORLD_SIZE=str(nproc),
+            MASTER_ADDR=master_addr,
+            MASTER_PORT=str(master_port),
+            # Intra-op threads match the pinned cores, so workers don't oversubscribe
+            OMP_NUM_THREADS=threads,
+            MKL_NUM_THREADS=threads,
+        )
+
+        print(f"🧵 Rank {rank}: cores {worker_cores[0]}-{worker_cores[-1]} ({threads} threads)")
+        try:
+            processes.append(subprocess.Popen(
+                [sys.executable, TRAINING_SCRIPT] + script_args,
+                env=env,
+                preexec_fn=(lambda c=worker_cores: os.sched_setaffinity(0, c))
+                if hasattr(os, "sched_setaffinity") else None,
+            ))
+        except BaseException:
+            _terminate(processes)
+            raise
+
+    return _wait_all(processes)
+
+
+def _terminate(processes, grace_seconds=10):
+    for p in processes:
+        if p.poll() is None:
+            p.terminate()
+    deadline = time.time() + grace_seconds
+    for p in processes:
+        try:
+            p.wait(timeout=max(0.0, deadline - time.time()))
+        except subprocess.TimeoutExpired:
+            p.kill()
+            p.wait()
+
+
+def _wait_all(processes, poll_interval=0.5):
+    """
+    Wait for every worker; as soon as one fails, stop the rest instead of
+    leaving them blocked in a gloo collective until the timeout
+    """
+    try:
+        while True:
+            codes = [p.poll() for p in processes]
+            failed = [i for i, code in enumerate(codes) if code not in (None, 0)]
+            if failed:
+                print(f"❌ Worker {failed[0]} exited with code {codes[failed[0]]} - stopping the others")
+                _terminate(processes)
+                return False
+            if all(code == 0 for code in codes):
+                return True
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrupted - stopping workers")
+        _terminate(processes)
+        raise
+
+
+def run_benchmark(nproc, steps, cores=None, script_args=(), batch_size=1,
+                  gradient_accumulation_steps=4, **launch_kwargs):
+    """
+    Train `steps` steps on one worker slice, then on nproc workers, and compare.
+    Both runs use the same per-rank micro-batch and accumulation, so only
+    the number of workers differs between them.
+    """
+    workdir = tempfile.mkdtemp(prefix="pet_scaling_")
+    throughput = {}
+
+    pinned_args = [
+        "--no-autotune",
+        "--batch-size", str(batch_size),
+        "--gradient-accumulation-steps", str(gradient_accumulation_steps),
+    ]
+
+    for n in (1, nproc):
+        metrics_file = os.path.join(workdir, f"metrics_{n}.json")
+        run_args = pinned_args + list(script_args) + [
+            "--output-dir", os.path.join(workdir, f"run_{n}"),
+            "--max-steps", str(steps),
+            "--metrics-file", metrics_file,
+            "--skip-final-save",
+        ]
+
+        print(f"\n⏱️  Benchmark: {n} worker(s), {steps} steps")
+        all_cores = cores or available_cores()
+        slice_cores = split_cores(all_cores, nproc)[0] if n == 1 else all_cores
+        run_kwargs = launch_kwargs if n > 1 else {}
+
+        start = time.time()
+        if not launch_workers(n, run_args, cores=slice_cores, **run_kwargs):
+            print(f"❌ Benchmark run with {n} worker(s) failed")
+            return None
+        elapsed = time.time() - start
+
+        if not os.path.exists(metrics_file):
+            # Not rank 0's node in a multi-node run
+            return None
+        with open(metrics_file, "r") as f:
+            metrics = json.load(f)
+        throughput[n] = metrics["train_samples_per_second"]
+        world_size = metrics.get("world_size", n)
+        print(f"✅ {throughput[n]:.2f} samples/s (wall time {elapsed:.1f}s)")
+
+    speedup = throughput[nproc] / throughput[1]
+    efficiency = speedup / world_size
+
+    print("\n📈 Scaling report")
+    print(f"   1 process:   {throughput[1]:.2f} samples/s")
+    print(f"   {world_size} processes: {throughput[nproc]:.2f} samples/s")
+    print(f"   Speedup:     {speedup:.2f}x")
+    print(f"   Efficiency:  {efficiency:.0%} of linear scaling")
+    return {"speedup": speedup, "efficiency": efficiency, "throughput": throughput}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="PET multi-process CPU data-parallel training")
+    parser.add_argument("--nproc", type=int, default=0,
+                        help="Worker processes on this machine (default: one per --cores-per-worker cores)")
+    parser.add_argument("--cores-per-worker", type=int, default=4)
+    parser.add_argument("--nnodes", type=int, default=1)
+    parser.add_argument("--node-rank", type=int, default=0)
+    parser.add_argument("--master-addr", default="127.0.0.1")
+    parser.add_argument("--master-port", type=int, default=29500)
+    parser.add_argument("--benchmark-steps", type=int, default=0,
+                        help="Measure scaling efficiency over N steps instead of training")
+    parser.add_argument("--benchmark-batch-size", type=int, default=1,
+                        help="Per-rank micro-batch used by both benchmark runs")
+    parser.add_argument("--benchmark-grad-accum", type=int, default=4,
+                        help="Per-rank gradient accumulation used by both benchmark runs")
+    args, script_args = parser.parse_known_args()
+    return args, script_args
+
+
+def main():
+    args, script_args = parse_args()
+    cores = available_cores()
+    nproc = args.nproc or max(1, len(cores) // args.cores_per_worker)
+
+    print("🚀 PET Distributed CPU Training")
+    print("=" * 50)
+    print(f"🖥️  {len(cores)} cores, {nproc} worker(s) on this node, {args.nnodes} node(s)")
+
+    launch_kwargs = dict(
+        nnodes=args.nnodes,
+        node_rank=args.node_rank,
+        master_addr=args.master_addr,
+        master_port=args.master_port,
+    )
+
+    if args.benchmark_steps:
+        report = run_benchmark(
+            nproc,
+            args.benchmark_steps,
+            cores=cores,
+            script_args=script_args,
+            batch_size=args.benchmark_batch_size,
+            gradient_accumulation_steps=args.benchmark_grad_accum,
+            **launch_kwargs,
+        )
+        return report is not None
+
+    return launch_workers(nproc, script_args, cores=cores, **launch_kwargs)
+
+
+if __name__ == "__main__":
+    success = main()
+    if success:
+        print("🎉 Distributed run complete!")
+    else:
+        print("❌ Distributed run failed - check worker logs above")
+        sys.exit(1)
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+PET Offline Evaluation Harness
+Runs the held-out PET prompt set against several model variants (base, adapter,
+merged, quantized) in parallel worker processes and reports quality
+(category accuracy, JSON-parse rate, rule coverage) next to latency/throughput
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import statistics
+import sys
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+from pet_data_generation import PET_SYSTEM_PROMPT, format_chatml, load_rules
+
+EVAL_PROMPTS_FILE = "pet_eval_prompts.json"
+RESULTS_FILE = "pet_eval_results.json"
+VARIANT_KINDS = ("hf", "peft", "int8", "onnx", "compile", "ollama")
+
+EVAL_INSTRUCTIONS = """{input}
+
+Respond with ONLY this JSON, no additional text:
+{{
+  "category": "one of: creative, technical, analytical, educational, business",
+  "applied_rules": ["names of the PET rules you applied"],
+  "improved_prompt": "the improved prompt"
+}}"""
+
+JSON_OBJECT = re.compile(r"\{[\s\S]*\}")
+
+
+def parse_variant(spec):
+    """Parse 'name=kind:location', e.g. 'adapter=peft:PET-Gemma-3N-2B-enhanced'"""
+    name, _, target = spec.partition("=")
+    kind, _, location = target.partition(":")
+    if not name or kind not in VARIANT_KINDS or not location:
+        raise ValueError(f"Bad variant '{spec}', expected name=<{'|'.join(VARIANT_KINDS)}>:<path or model>")
+    return {"name": name, "kind": kind, "location": location}
+
+
+def eval_prompt(case):
+    return format_chatml([
+        ("system", PET_SYSTEM_PROMPT),
+        ("user", EVAL_INSTRUCTIONS.format(input=case["input"])),
+    ]) + "<|im_start|>assistant\n"
+
+
+# ---------------------------------------------------------------------------
+# Scoring
+# ---------------------------------------------------------------------------
+
+def parse_json_response(response):
+    """Extract the first JSON object from a response, or None"""
+    match = JSON_OBJECT.search(response or "")
+    if not match:
+        return None
+    try:
+        parsed = json.loads(match.group(0))
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def rule_coverage(response, expected_rules, rules_by_key):
+    """Fraction of expected rules mentioned by key, PET id or name"""
+    if not expected_rules:
+        return 1.0
+    lowered = (response or "").lower()
+    hits = 0
+    for key in expected_rules:
+        rule = rules_by_key.get(key, {})
+        aliases = [key, rule.get("id", ""), rule.get("name", "")]
+        if any(alias and alias.lower() in lowered for alias in aliases):
+            hits += 1
+    return hits / len(expected_rules)
+
+
+def score_case(case, response, rules_by_key):
+    parsed = parse_json_response(response)
+    category = str(parsed.get("category", "")).strip().lower() if parsed else ""
+    return {
+        "json_ok": parsed is not None,
+        "category_ok": category == case["expected_category"],
+        "rule_coverage": rule_coverage(response, case.get("expected_rules", []), rules_by_key),
+    }
+
+
+def summarize(records):
+    latencies = [r["latency"] for r in records]
+    total_time = sum(latencies)
+    total_tokens = sum(r["tokens"] for r in records)
+    return {
+        "cases": len(records),
+        "category_accuracy": statistics.mean(r["category_ok"] for r in records),
+        "json_parse_rate": statistics.mean(r["json_ok"] for r in records),
+        "rule_coverage": statistics.mean(r["rule_coverage"] for r in records),
+        "latency_mean_s": statistics.mean(latencies),
+        "latency_p50_s": statistics.median(latencies),
+        "latency_p95_s": sorted(latencies)[max(0, int(round(0.95 * len(latencies))) - 1)],
+        "tokens_per_second": total_tokens / total_time if total_time else 0.0,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Model backends (imported lazily inside the worker process)
+# ---------------------------------------------------------------------------
+
+def _load_transformers_variant(variant):
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    location = variant["location"]
+    if variant["kind"] in ("onnx", "compile"):
+        from pet_compiled_inference import load_model
+        tokenizer = AutoTokenizer.from_pretrained(location)
+        model = load_model(location, variant["kind"], torch.get_num_threads())
+    elif variant["kind"] == "peft":
+        from peft import PeftModel
+        with open(os.path.join(location, "adapter_config.json"), "r") as f:
+            base_name = json.load(f)["base_model_name_or_path"]
+        tokenizer = AutoTokenizer.from_pretrained(base_name)
+        model = AutoModelForCausalLM.from_pretrained(base_name, torch_dtype=torch.float32)
+        model = PeftModel.from_pretrained(model, location)
+    else:
+        tokenizer = AutoTokenizer.from_pretrained(location)
+        model = AutoModelForCausalLM.from_pretrained(location, torch_dtype=torch.float32)
+
+    if variant["kind"] == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if variant["kind"] not in ("onnx", "compile"):
+        model.eval()
+
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    def generate(prompt, max_new_tokens):
+        inputs = tokenizer(prompt, return_tensors="pt")
+        with torch.no_grad():
+            outputs = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=tokenizer.pad_token_id,
+                eos_token_id=tokenizer.eos_token_id,
+            )
+        new_tokens = outputs[0][inputs["input_ids"].shape[1]:]
+        return tokenizer.decode(new_tokens, skip_special_tokens=True), len(new_tokens)
+
+    return generate
+
+
+def _ollama_generator(variant, base_url):
+    def generate(prompt, max_new_tokens):
+        body = json.dumps({
+            "model": variant["location"],
+            "prompt": prompt,
+            "raw": True,  # Prompt is already ChatML-formatted
+            "stream": False,
+            "options": {"temperature": 0, "num_predict": max_new_tokens},
+        }).encode()
+        request = urllib.request.Request(
+            f"{base_url}/api/generate", data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=600) as response:
+            result = json.loads(response.read())
+        return result["response"], result.get("eval_count", 0)
+
+    return generate
+
+
+def evaluate_variant(variant, cases, threads, max_new_tokens, ollama_url):
+    """Worker process entry point: load one variant and run every case through it"""
+    if variant["kind"] == "ollama":
+        generate = _ollama_generator(variant, ollama_url)
+    else:
+        import torch
+        torch.set_num_threads(threads)
+        generate = _load_transformers_variant(variant)
+
+        # Untimed pass over every case: torch.compile compiles per prefill length
+        # and eager pays lazy initialization, neither of which belongs in latency
+        for case in cases:
+            try:
+                generate(eval_prompt(case), max_new_tokens)
+            except Exception:
+                pass  # Reported by the timed loop below
+
+    rules_by_key = {rule["key"]: rule for rule in load_rules()}
+    records = []
+    for case in cases:
+        start = time.time()
+        try:
+            response, tokens = generate(eval_prompt(case), max_new_tokens)
+        except Exception as e:
+            print(f"⚠️  [{variant['name']}] {case['name']}: {e}")
+            response, tokens = "", 0
+        record = {"name": case["name"], "latency": time.time() - start, "tokens": tokens}
+        record.update(score_case(case, response, rules_by_key))
+        records.append(record)
+
+    return {"variant": variant, "summary": summarize(records), "cases": records}
+
+
+def run_evaluation(variants, cases, max_new_tokens=256, ollama_url="http://localhost:11434"):
+    """Evaluate all variants in parallel, one process each, splitting cores between them"""
+    local_variants = sum(1 for v in variants if v["kind"] != "ollama")
+    threads = max(1, (os.cpu_count() or 1) // max(1, local_variants))
+
+    # spawn: each worker gets a fresh interpreter with its own torch thread pool.
+    # One pool per variant, so a worker that crashes can't break the others.
+    context = multiprocessing.get_context("spawn")
+    pools = [ProcessPoolExecutor(max_workers=1, mp_context=context) for _ in variants]
+    try:
+        futures = [
+            pool.submit(evaluate_variant, v, cases, threads, max_new_tokens, ollama_url)
+            for pool, v in zip(pools, variants)
+        ]
+
+        results = []
+        for variant, future in zip(variants, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"❌ [{variant['name']}] failed: {type(e).__name__}: {e}")
+                results.append({"variant": variant, "error": f"{type(e).__name__}: {e}",
+                                "summary": None, "cases": []})
+        return results
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def print_report(results):
+    header = f"{'variant':<14}{'cat acc':>9}{'json ok':>9}{'rules':>8}{'p50 s':>8}{'p95 s':>8}{'tok/s':>8}"
+    print("\n📈 Evaluation report")
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        if result.get("error"):
+            print(f"{result['variant']['name']:<14}FAILED: {result['error']}")
+            continue
+        s = result["summary"]
+        print(f"{result['variant']['name']:<14}{s['category_accuracy']:>9.0%}{s['json_parse_rate']:>9.0%}"
+              f"{s['rule_coverage']:>8.0%}{s['latency_p50_s']:>8.2f}{s['latency_p95_s']:>8.2f}"
+              f"{s['tokens_per_second']:>8.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare PET model variants on the held-out prompt set")
+    parser.add_argument("variants", nargs="+",
+                        help="name=kind:location, kind one of hf, peft, int8, onnx, compile, ollama "
+                             "(e.g. adapter=peft:PET-Gemma-3N-2B-enhanced)")
+    parser.add_argument("--prompts", default=EVAL_PROMPTS_FILE)
+    parser.add_argument("--max-new-tokens", type=int, default=256)
+    parser.add_argument("--ollama-url", default="http://localhost:11434")
+    parser.add_argument("--output", default=RESULTS_FILE)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print("🚀 PET Offline Evaluation")
+    print("=" * 50)
+
+    try:
+        variants = [parse_variant(spec) for spec in args.variants]
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+
+    with open(args.prompts, "r") as f:
+        cases = json.load(f)
+    print(f"📋 {len(cases)} prompts x {len(variants)} variants")
+
+    results = run_evaluation(variants, cases, args.max_new_tokens, args.ollama_url)
+    print_report(results)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Detailed results: {args.output}")
+    return any(not result.get("error") for result in results)
+
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+PET Startup Profiler
+Breaks time-to-ready into phases (import, tokenizer, weight-load,
+adapter-attach, warmup) so cold-start regressions are visible
+"""
+
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """Records wall-clock time per named startup phase"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        phase_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - phase_start))
+
+    def total(self):
+        return time.perf_counter() - self.start
+
+    def report(self):
+        total = self.total()
+        print("\n⏱️  Startup profile")
+        for name, seconds in self.phases:
+            share = seconds / total if total else 0.0
+            print(f"   {name:<16}{seconds:>8.2f}s  {share:>5.0%}")
+        other = total - sum(seconds for _, seconds in self.phases)
+        print(f"   {'other':<16}{other:>8.2f}s")
+        print(f"   {'time-to-ready':<16}{total:>8.2f}s")
+        return dict(self.phases, total=total)
@@ -4,7 +4,9 @@ PET Fine-tuning Script - Simplified Version
 Using transformers library for CPU-based training
 """
 
+import argparse
 import json
+import os
 import torch
 from transformers import (
     AutoTokenizer, 
@@ -14,26 +16,41 @@ from transformers import (
     DataCollatorForLanguageModeling
 )
 from datasets import Dataset
+from peft import LoraConfig, get_peft_model
 
-def load_training_data():
-    """Load PET training data"""
-    with open("pet_training_data.json", "r") as f:
-        data = json.load(f)
+from pet_autotune import autotune, required_seq_len
+from pet_checkpointing import AsyncCheckpointCallback, find_latest_checkpoint
+
+OUTPUT_DIR = "./pet_finetuned"
+
+def load_training_data(path="pet_training_data.json"):
+    """Load PET training data (JSON list or ChatML JSONL from pet_data_generation.py)"""
+    with open(path, "r") as f:
+        if path.endswith(".jsonl"):
+            data = [{"text": json.loads(line)["text"]} for line in f if line.strip()]
+        else:
+            data = json.load(f)
     return Dataset.from_list(data)
 
-def tokenize_function(examples, tokenizer):
+def tokenize_function(examples, tokenizer, max_length=512):
     """Tokenize the training data"""
     return tokenizer(
         examples["text"],
         truncation=True,
         padding=True,
-        max_length=512,
+        max_length=max_length,
         return_tensors="pt"
     )
 
-def main():
+def main(output_dir=OUTPUT_DIR, max_steps=-1, metrics_file=None, save_final=True,
+         target_batch_size=4, max_length=512, memory_limit_gb=None, use_autotune=True,
+         data_file="pet_training_data.json", batch_size=None, gradient_accumulation_steps=None):
     print("🚀 Starting PET Fine-tuning...")
 
+    # Set by pet_distributed_training.py when running data-parallel workers
+    world_size = int(os.environ.get("WORLD_SIZE", 1))
+    local_world_size = int(os.environ.get("LOCAL_WORLD_SIZE", world_size))
+
     # Load model and tokenizer (using a smaller model for CPU training)
     model_name = "google/gemma-2b"  # Fallback to available model
 
@@ -50,6 +67,18 @@ def main():
         if tokenizer.pad_token is None:
             tokenizer.pad_token = tokenizer.eos_token
 
+        # Train LoRA adapters only (matches PET-Gemma-3N-2B-enhanced/adapter_config.json)
+        lora_config = LoraConfig(
+            r=16,
+            lora_alpha=16,
+            lora_dropout=0.0,
+            target_modules=["q_proj", "k_proj", "v_proj", "o_proj",
+                            "gate_proj", "up_proj", "down_proj"],
+            bias="none",
+            task_type="CAUSAL_LM",
+        )
+        model = get_peft_model(model, lora_config)
+
         print("✅ Model loaded successfully")
 
     except Exception as e:
@@ -59,28 +88,54 @@ def main():
 
     # Load and tokenize dataset
     print("📊 Preparing dataset...")
-    dataset = load_training_data()
+    dataset = load_training_data(data_file)
+
+    # Join the process group before autotuning, so rank 0 can probe
+    # alone and broadcast its settings (the Trainer reuses this group)
+    if world_size > 1 and not torch.distributed.is_initialized():
+        torch.distributed.init_process_group(backend="gloo")
+
+    # Pick micro-batch, sequence length and accumulation by measurement
+    if use_autotune:
+        settings = autotune(
+            model,
+            model_name,
+            seq_len=required_seq_len(dataset["text"], tokenizer, max_length),
+            target_batch_size=target_batch_size,
+            memory_limit_gb=memory_limit_gb,
+            world_size=world_size,
+            local_world_size=local_world_size,
+        )
+    else:
+        settings = {
+            "batch_size": batch_size or 1,
+            "seq_len": max_length,
+            "gradient_accumulation_steps": gradient_accumulation_steps
+            or max(1, target_batch_size // ((batch_size or 1) * world_size)),
+        }
+
     tokenized_dataset = dataset.map(
-        lambda x: tokenize_function(x, tokenizer),
+        lambda x: tokenize_function(x, tokenizer, settings["seq_len"]),
         batched=True,
         remove_columns=dataset.column_names
     )
 
     # Training arguments
     training_args = TrainingArguments(
-        output_dir="./pet_finetuned",
-        overwrite_output_dir=True,
+        output_dir=output_dir,
         num_train_epochs=1,  # Start with 1 epoch
-        per_device_train_batch_size=1,
-        gradient_accumulation_steps=4,
+        max_steps=max_steps,
+        per_device_train_batch_size=settings["batch_size"],
+        gradient_accumulation_steps=settings["gradient_accumulation_steps"],
         warmup_steps=10,
         learning_rate=5e-5,
         logging_steps=5,
-        save_steps=50,
         evaluation_strategy="no",
-        save_strategy="steps",
+        save_strategy="no",  # Handled by AsyncCheckpointCallback
         load_best_model_at_end=False,
         report_to=None,  # Disable wandb/tensorboard
+        ddp_backend="gloo" if world_size > 1 else None,
+        use_cpu=True,
     )
 
     # Data collator
@@ -95,22 +150,60 @@ def main():
         args=training_args,
         train_dataset=tokenized_dataset,
         data_collator=data_collator,
+        callbacks=[AsyncCheckpointCallback(output_dir, save_steps=50, save_total_limit=3)],
     )
 
-    # Start training
+    # Start training (resumes automatically after an interrupted run;
+    # rank 0 picks the checkpoint so all ranks resume from the same step)
     print("🔥 Starting training...")
-    trainer.train()
+    result = trainer.train(resume_from_checkpoint=find_latest_checkpoint(output_dir))
+
+    if metrics_file and trainer.is_world_process_zero():
+        metrics = dict(result.metrics, world_size=world_size)
+        with open(metrics_file, "w") as f:
+            json.dump(metrics, f, indent=2)
 
     # Save the model
-    print("💾 Saving model...")
-    trainer.save_model("./pet_finetuned_final")
-    tokenizer.save_pretrained("./pet_finetuned_final")
+    if save_final:
+        print("💾 Saving model...")
+        trainer.save_model("./pet_finetuned_final")
+        if trainer.is_world_process_zero():
+            tokenizer.save_pretrained("./pet_finetuned_final")
 
     print("✅ Training complete!")
     return True
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="PET fine-tuning (CPU)")
+    parser.add_argument("--data-file", default="pet_training_data.json", help="Training data (.json or .jsonl)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Checkpoint directory")
+    parser.add_argument("--max-steps", type=int, default=-1, help="Stop after N optimizer steps")
+    parser.add_argument("--metrics-file", help="Write final training metrics (rank 0) to this JSON file")
+    parser.add_argument("--skip-final-save", action="store_true", help="Don't save the final model")
+    parser.add_argument("--target-batch-size", type=int, default=4, help="Effective batch size across all workers")
+    parser.add_argument("--max-length", type=int, default=512, help="Upper bound on sequence length")
+    parser.add_argument("--memory-limit-gb", type=float, help="Memory budget per process (default: 90%% of RAM / workers)")
+    parser.add_argument("--no-autotune", action="store_true", help="Use --batch-size and --max-length without probing")
+    parser.add_argument("--batch-size", type=int, help="Per-rank micro-batch with --no-autotune (default: 1)")
+    parser.add_argument("--gradient-accumulation-steps", type=int,
+                        help="Per-rank accumulation with --no-autotune (default: from --target-batch-size)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    success = main()
+    args = parse_args()
+    success = main(
+        output_dir=args.output_dir,
+        max_steps=args.max_steps,
+        metrics_file=args.metrics_file,
+        save_final=not args.skip_final_save,
+        target_batch_size=args.target_batch_size,
+        max_length=args.max_length,
+        memory_limit_gb=args.memory_limit_gb,
+        use_autotune=not args.no_autotune,
+        data_file=args.data_file,
+        batch_size=args.batch_size,
+        gradient_accumulation_steps=args.gradient_accumulation_steps,
+    )
     if success:
         print("🎉 PET fine-tuning successful!")
     else: